@@ -0,0 +1,91 @@
+"""
+Buffered writer for per-order automation logs.
+
+Entries are collected in memory and written to the automation_logs
+collection with insert_many, either when the buffer reaches a batch size
+or when the flush interval elapses. Entries that fail to write are kept
+and retried. The buffer is capped, so a database outage drops the oldest
+entries rather than exhausting memory.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class AutomationLogSink:
+    """Batches AutomationLog documents into insert_many calls"""
+
+    def __init__(
+        self,
+        collection,
+        batch_size: int = 200,
+        flush_interval: float = 2.0,
+        max_buffered: int = 10000,
+    ):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer: Deque[Dict[str, Any]] = deque(maxlen=max_buffered)
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def add(self, entry: Dict[str, Any]):
+        """Queue a log document, starting a flush once a full batch is waiting"""
+        if len(self.buffer) == self.buffer.maxlen:
+            logger.warning("Automation log buffer full, dropping oldest entry")
+        self.buffer.append(entry)
+
+        if len(self.buffer) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of entries written.
+
+        Entries that fail to write go back to the front of the buffer, to be
+        retried on the next flush or dropped as the oldest if it fills up.
+        """
+        if not self.buffer:
+            return 0
+
+        batch = list(self.buffer)
+        self.buffer.clear()
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # A duplicate _id means the entry was written by an earlier attempt
+            failed = [
+                batch[error["index"]] for error in e.details.get("writeErrors", [])
+                if error.get("code") != DUPLICATE_KEY_ERROR
+            ]
+            if failed:
+                self._requeue(failed)
+                logger.error(f"Failed to write {len(failed)} of {len(batch)} automation logs, will retry: {str(e)}")
+            return e.details.get("nInserted", 0)
+        except Exception as e:
+            self._requeue(batch)
+            logger.error(f"Failed to write {len(batch)} automation logs, will retry: {str(e)}")
+            return 0
+        return len(batch)
+
+    def _requeue(self, entries: List[Dict[str, Any]]):
+        # Extending on the right drops from the left, so when the combined
+        # entries exceed maxlen the oldest ones are the ones lost
+        buffer: Deque[Dict[str, Any]] = deque(entries, maxlen=self.buffer.maxlen)
+        buffer.extend(self.buffer)
+        dropped = len(entries) + len(self.buffer) - len(buffer)
+        if dropped > 0:
+            logger.warning(f"Automation log buffer full, dropping {dropped} oldest entries")
+        self.buffer = buffer
+
+    async def run(self):
+        """Flush on the time threshold until cancelled"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+API benchmark over a seeded local MongoDB.
+
+Seeds a dedicated database with synthetic top-up orders and status
+checks, then measures latency percentiles and throughput for the read
+endpoints. Requests go through the FastAPI app in-process by default,
+so results cover the app and MongoDB but not the network; pass
+--base-url to benchmark a running server instead. The automation
+background task is stubbed out, so nothing reaches Garena.
+
+The JSON report is meant to be kept per commit and compared:
+    python benchmark_api.py --orders 100000 --output bench-$(git rev-parse --short HEAD).json
+
+Seeding is deterministic for a given --seed and --orders. A database
+that already holds the requested number of orders is reused unless
+--reseed is passed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+
+STATUS_WEIGHTS = {"completed": 70, "failed": 15, "manual_pending": 8, "processing": 2, "queued": 5}
+DIAMOND_AMOUNTS = [25, 50, 100, 310, 520, 1060]
+INSERT_BATCH = 10000
+
+
+def synthetic_order(rng: random.Random, now: datetime, history_days: int) -> Dict[str, Any]:
+    created_at = now - timedelta(seconds=rng.randrange(history_days * 86400))
+    status = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+    finished = status in ("completed", "failed", "manual_pending")
+    return {
+        "order_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        "status": status,
+        "player_uid": str(rng.randrange(100000000, 999999999)),
+        "diamond_amount": rng.choice(DIAMOND_AMOUNTS),
+        "message": "Successfully topped up" if status == "completed" else "Automation finished",
+        "screenshots": [f"{rng.getrandbits(128):032x}" for _ in range(rng.randrange(0, 12))],
+        "error": "captcha_failed" if status == "manual_pending" else None,
+        "created_at": created_at,
+        "completed_at": created_at + timedelta(seconds=rng.randrange(30, 900)) if finished else None,
+        "updated_at": created_at,
+    }
+
+
+async def seed(db, orders: int, status_checks: int, seed_value: int, reseed: bool):
+    """Fill the benchmark database, reusing it when it already matches"""
+    existing = await db.topup_orders.estimated_document_count()
+    if existing == orders and not reseed:
+        print(f"Reusing {existing} seeded orders")
+        return
+
+    await db.topup_orders.drop()
+    await db.status_checks.drop()
+
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    for offset in range(0, orders, INSERT_BATCH):
+        batch = [synthetic_order(rng, now, 365) for _ in range(min(INSERT_BATCH, orders - offset))]
+        await db.topup_orders.insert_many(batch, ordered=False)
+        print(f"\rSeeded {offset + len(batch)}/{orders} orders", end="", flush=True)
+    print(f" in {time.perf_counter() - started:.1f}s")
+
+    checks = [
+        {"id": str(uuid.uuid4()), "client_name": f"client-{i % 50}", "timestamp": now - timedelta(minutes=i)}
+        for i in range(status_checks)
+    ]
+    if checks:
+        await db.status_checks.insert_many(checks, ordered=False)
+
+
+def summarize(latencies: List[float], errors: int, wall_seconds: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 3)
+
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3) if ordered else 0.0,
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "throughput_rps": round(len(latencies) / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    make_url: Callable[[int], str],
+    requests: int,
+    concurrency: int,
+    warmup: int,
+) -> Dict[str, Any]:
+    """Issue ``requests`` GETs with at most ``concurrency`` in flight"""
+    for i in range(warmup):
+        await client.get(make_url(i))
+
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        url = make_url(i)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(url)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main(args):
+    # The app reads its configuration at import time, so point it at the
+    # benchmark database before importing it
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    os.environ["STATS_CACHE_TTL"] = str(args.stats_cache_ttl)
+    sys.path.insert(0, str(Path(__file__).parent))
+
+    from db_indexes import ensure_indexes
+
+    mongo = AsyncIOMotorClient(args.mongo_url, tz_aware=True)
+    db = mongo[args.db_name]
+    await seed(db, args.orders, args.status_checks, args.seed, args.reseed)
+    # Reseeding drops the collections and their indexes, and a server under
+    # --base-url only builds indexes at startup, so rebuild them here
+    await ensure_indexes(db)
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        import server
+
+        async def no_automation(*_args, **_kwargs):
+            return None
+
+        server.run_automation_task = no_automation
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench", timeout=60)
+
+    rng = random.Random(args.seed)
+    sample = await db.topup_orders.find({}, {"_id": 0, "order_id": 1, "player_uid": 1}).limit(1000).to_list(1000)
+
+    async with client:
+        # Cursor for a page deep into the history, found by walking the list once
+        deep_cursor = None
+        for _ in range(args.deep_pages):
+            params = {"limit": 50, **({"cursor": deep_cursor} if deep_cursor else {})}
+            deep_cursor = (await client.get("/api/automation/orders", params=params)).json().get("next_cursor")
+            if not deep_cursor:
+                break
+
+        def constant(url: str) -> Callable[[int], str]:
+            return lambda _i: url
+
+        def random_order(_i: int) -> str:
+            return f"/api/automation/orders/{rng.choice(sample)['order_id']}"
+
+        def random_player(_i: int) -> str:
+            return f"/api/automation/orders?player_uid={rng.choice(sample)['player_uid']}&limit=50"
+
+        def random_player_prefix(_i: int) -> str:
+            return f"/api/automation/orders?player_uid_prefix={rng.choice(sample)['player_uid'][:4]}&limit=50"
+
+        scenarios: Dict[str, Callable[[int], str]] = {
+            "orders_first_page": constant("/api/automation/orders?limit=50"),
+            "orders_by_status": constant("/api/automation/orders?status=failed&limit=50"),
+            "order_by_id": random_order,
+            "orders_by_player_uid": random_player,
+            "orders_by_uid_prefix": random_player_prefix,
+            "stats": constant("/api/automation/stats"),
+            "status_checks": constant("/api/status"),
+        }
+        if deep_cursor:
+            scenarios["orders_deep_page"] = constant(f"/api/automation/orders?limit=50&cursor={deep_cursor}")
+
+        results = {}
+        for name, make_url in scenarios.items():
+            results[name] = await run_scenario(client, make_url, args.requests, args.concurrency, args.warmup)
+            r = results[name]
+            print(f"{name:<20} p50 {r['p50_ms']:>9.2f}ms  p99 {r['p99_ms']:>9.2f}ms  "
+                  f"{r['throughput_rps']:>8.1f} req/s  errors {r['errors']}")
+
+    server_info = await mongo.server_info()
+    mongo.close()
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "mongodb": server_info.get("version"),
+            "target": args.base_url or "in-process",
+            "orders": args.orders,
+            "status_checks": args.status_checks,
+            "requests_per_scenario": args.requests,
+            "concurrency": args.concurrency,
+            "stats_cache_ttl": args.stats_cache_ttl,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the top-up API against a seeded MongoDB")
+    parser.add_argument("--mongo-url", default=os.environ.get("BENCH_MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-name", default="topup_benchmark", help="Database to seed; it is dropped and refilled")
+    parser.add_argument("--orders", type=int, default=10000, help="Synthetic orders to seed (e.g. 10000 to 5000000)")
+    parser.add_argument("--status-checks", type=int, default=1000, help="Synthetic status checks to seed")
+    parser.add_argument("--reseed", action="store_true", help="Drop and reseed even if the order count matches")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and request selection")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests per scenario")
+    parser.add_argument("--deep-pages", type=int, default=100, help="Pages to walk before the deep-page scenario")
+    parser.add_argument("--stats-cache-ttl", type=float, default=0,
+                        help="STATS_CACHE_TTL for the in-process app; 0 measures the uncached aggregation")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", default="benchmark_report.json", help="Where to write the JSON report")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,188 @@
+"""
+MongoDB index management for the top-up backend.
+
+Declares the indexes each collection needs and, when the API starts up,
+builds any that are missing, brings TTL expiry in line with the
+configured values and drops indexes that are no longer declared.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+# Automation logs older than this are removed by MongoDB's TTL monitor
+AUTOMATION_LOG_TTL_SECONDS = int(float(os.environ.get('AUTOMATION_LOG_TTL_DAYS', '30')) * 86400)
+
+# Status checks older than this are removed by MongoDB's TTL monitor
+STATUS_CHECK_TTL_SECONDS = int(float(os.environ.get('STATUS_CHECK_TTL_DAYS', '7')) * 86400)
+
+# Archived orders are dropped this long after archival; unset keeps them forever
+ORDER_ARCHIVE_TTL_DAYS = os.environ.get('ORDER_ARCHIVE_TTL_DAYS')
+
+# ===== INDEX DEFINITIONS =====
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "topup_orders": [
+        IndexModel([("order_id", ASCENDING)], name="order_id_unique", unique=True, background=True),
+        IndexModel(
+            [("created_at", DESCENDING), ("order_id", DESCENDING)],
+            name="created_at_order_id",
+            background=True,
+        ),
+        IndexModel(
+            [("status", ASCENDING), ("created_at", DESCENDING), ("order_id", DESCENDING)],
+            name="status_created_at_order_id",
+            background=True,
+        ),
+        IndexModel(
+            [("player_uid", ASCENDING), ("created_at", DESCENDING), ("order_id", DESCENDING)],
+            name="player_uid_created_at_order_id",
+            background=True,
+        ),
+    ],
+    "topup_orders_archive": [
+        IndexModel([("order_id", ASCENDING)], name="order_id_unique", unique=True, background=True),
+        IndexModel(
+            [("created_at", DESCENDING), ("order_id", DESCENDING)],
+            name="created_at_order_id",
+            background=True,
+        ),
+        IndexModel(
+            [("player_uid", ASCENDING), ("created_at", DESCENDING), ("order_id", DESCENDING)],
+            name="player_uid_created_at_order_id",
+            background=True,
+        ),
+    ],
+    "order_rollups": [
+        IndexModel(
+            [("granularity", ASCENDING), ("bucket", ASCENDING)],
+            name="granularity_bucket_unique",
+            unique=True,
+            background=True,
+        ),
+    ],
+    "automation_logs": [
+        IndexModel(
+            [("order_id", ASCENDING), ("timestamp", ASCENDING), ("id", ASCENDING)],
+            name="order_id_timestamp_id",
+            background=True,
+        ),
+        IndexModel(
+            [("timestamp", ASCENDING)],
+            name="timestamp_ttl",
+            expireAfterSeconds=AUTOMATION_LOG_TTL_SECONDS,
+            background=True,
+        ),
+    ],
+    "status_checks": [
+        IndexModel(
+            [("timestamp", DESCENDING), ("id", DESCENDING)],
+            name="timestamp_id",
+            background=True,
+        ),
+        # TTL indexes must be single-field, so expiry needs its own index
+        IndexModel(
+            [("timestamp", ASCENDING)],
+            name="timestamp_ttl",
+            expireAfterSeconds=STATUS_CHECK_TTL_SECONDS,
+            background=True,
+        ),
+    ],
+}
+
+if ORDER_ARCHIVE_TTL_DAYS:
+    INDEX_SPECS["topup_orders_archive"].append(
+        IndexModel(
+            [("archived_at", ASCENDING)],
+            name="archived_at_ttl",
+            expireAfterSeconds=int(float(ORDER_ARCHIVE_TTL_DAYS) * 86400),
+            background=True,
+        )
+    )
+
+# Indexes this module used to declare; dropped if still present
+RETIRED_INDEXES: Dict[str, List[str]] = {
+    # Superseded by player_uid_created_at_order_id
+    "topup_orders": ["player_uid"],
+    # Superseded by created_at_order_id
+    "topup_orders_archive": ["created_at"],
+}
+
+if not ORDER_ARCHIVE_TTL_DAYS:
+    RETIRED_INDEXES["topup_orders_archive"].append("archived_at_ttl")
+
+
+async def sync_ttl(db, collection_name: str, model: IndexModel, existing: Dict[str, Any]) -> bool:
+    """Apply a changed expireAfterSeconds to an existing TTL index; returns whether it changed"""
+    name = model.document["name"]
+    wanted = model.document.get("expireAfterSeconds")
+    current = existing.get("expireAfterSeconds")
+    if wanted is None or (current is not None and int(current) == wanted):
+        return False
+
+    await db.command("collMod", collection_name, index={"name": name, "expireAfterSeconds": wanted})
+    logger.info(f"Changed TTL of {name} on {collection_name} from {current} to {wanted} seconds")
+    return True
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create every declared index that does not exist yet.
+
+    Existing indexes are kept, so this is safe to run on every startup;
+    only their TTL is updated when the configured expiry changes. Retired
+    indexes are dropped. An index that fails to build is logged and
+    skipped, so the rest are still built. Returns the names of the indexes
+    created, keyed by collection.
+    """
+    created: Dict[str, List[str]] = {}
+    changed = False
+    failed = False
+
+    for collection_name in {**INDEX_SPECS, **RETIRED_INDEXES}:
+        collection = db[collection_name]
+        try:
+            existing = await collection.index_information()
+        except PyMongoError as e:
+            logger.error(f"Failed to read indexes on {collection_name}: {e}")
+            failed = True
+            continue
+
+        # One index at a time, since a failed createIndexes builds none of
+        # its indexes; duplicate order_ids must not also block the others
+        for model in INDEX_SPECS.get(collection_name, []):
+            name = model.document["name"]
+            try:
+                if name in existing:
+                    changed |= await sync_ttl(db, collection_name, model, existing[name])
+                    continue
+                await collection.create_indexes([model])
+            except PyMongoError as e:
+                logger.error(f"Failed to create or update index {name} on {collection_name}: {e}")
+                failed = True
+                continue
+            created.setdefault(collection_name, []).append(name)
+
+        for name in RETIRED_INDEXES.get(collection_name, []):
+            if name not in existing:
+                continue
+            try:
+                await collection.drop_index(name)
+            except PyMongoError as e:
+                logger.error(f"Failed to drop index {name} on {collection_name}: {e}")
+                failed = True
+                continue
+            changed = True
+            logger.info(f"Dropped retired index {name} on {collection_name}")
+
+        if collection_name in created:
+            logger.info(f"Created indexes on {collection_name}: {', '.join(created[collection_name])}")
+
+    if not created and not changed and not failed:
+        logger.info("All MongoDB indexes already present")
+
+    return created
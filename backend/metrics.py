@@ -0,0 +1,82 @@
+"""
+Prometheus instrumentation for the API.
+
+Two sets of histograms are kept: request latency per route (recorded by
+an HTTP middleware) and MongoDB command time per collection and command
+(recorded by a pymongo command listener attached to the Motor client).
+Comparing the two tells a slow endpoint apart from a slow query.
+"""
+
+import logging
+import time
+from typing import Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from pymongo import monitoring
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger(__name__)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route template",
+    ["method", "route", "status"],
+)
+
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command round-trip time, by collection and command",
+    ["collection", "command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that returned an error",
+    ["collection", "command"],
+)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command sent through the client it is registered on"""
+
+    def __init__(self):
+        # Collection names are only present on the started event
+        self._collections: Dict[tuple, str] = {}
+
+    def started(self, event):
+        value = event.command.get(event.command_name)
+        if not isinstance(value, str):
+            # getMore names its collection separately; admin commands have none
+            value = event.command.get("collection")
+        collection = value if isinstance(value, str) else "-"
+        self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "-")
+        MONGO_COMMAND_SECONDS.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop((event.connection_id, event.request_id), "-")
+        MONGO_COMMAND_SECONDS.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(collection, event.command_name).inc()
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Record request latency labelled by the matched route, not the raw path"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        # Unmatched paths share one label so arbitrary URLs cannot grow the series count
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_SECONDS.labels(request.method, route_path, str(status)).observe(time.perf_counter() - start)
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
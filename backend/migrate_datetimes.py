@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+One-off migration: convert ISO-string timestamps to native BSON datetimes.
+
+Older versions of server.py stored created_at / completed_at / updated_at
+(topup_orders) and timestamp (status_checks) as isoformat() strings.
+This rewrites them in place with batched bulk writes. It is safe to run
+more than once; documents that are already converted are skipped.
+
+Usage:
+    python migrate_datetimes.py [--batch-size 1000] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Timestamp fields to convert, per collection
+DATETIME_FIELDS: Dict[str, List[str]] = {
+    "topup_orders": ["created_at", "completed_at", "updated_at"],
+    "status_checks": ["timestamp"],
+}
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an isoformat() string, treating naive values as UTC"""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def migrate_collection(collection, fields: List[str], batch_size: int, dry_run: bool) -> int:
+    """Convert string timestamps in one collection, walking it in _id order"""
+    query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    projection = {field: 1 for field in fields}
+    last_id = None
+    converted = 0
+
+    while True:
+        batch_query = query if last_id is None else {"$and": [query, {"_id": {"$gt": last_id}}]}
+        docs = await collection.find(batch_query, projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+
+        operations = []
+        for doc in docs:
+            update = {}
+            for field in fields:
+                value = doc.get(field)
+                if not isinstance(value, str):
+                    continue
+                try:
+                    update[field] = parse_timestamp(value)
+                except ValueError:
+                    logger.warning(f"Skipping unparseable {field} on {collection.name} {doc['_id']}: {value!r}")
+            if update:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+
+        if operations and not dry_run:
+            await collection.bulk_write(operations, ordered=False)
+        converted += len(operations)
+        logger.info(f"{collection.name}: {converted} documents converted so far")
+
+    return converted
+
+
+async def main(batch_size: int, dry_run: bool):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        for collection_name, fields in DATETIME_FIELDS.items():
+            converted = await migrate_collection(db[collection_name], fields, batch_size, dry_run)
+            action = "would convert" if dry_run else "converted"
+            logger.info(f"{collection_name}: {action} {converted} documents")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Convert ISO-string timestamps to BSON datetimes")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="Count documents without writing")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.dry_run))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Hot/cold archival for top-up orders.
+
+Terminal orders (completed or failed) older than ORDER_ARCHIVE_AFTER_DAYS
+are moved from topup_orders into topup_orders_archive in batches, so the
+dashboard, listing and stats queries only touch recent orders. Per-status
+counts of archived orders are kept in order_counters so all-time totals
+stay available without scanning the archive (they are not reduced when
+ORDER_ARCHIVE_TTL_DAYS expires archived orders).
+
+The API runs archive_orders() periodically. It can also be run by hand:
+    python order_archive.py [--older-than-days 30] [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_COLLECTION = "topup_orders_archive"
+ARCHIVABLE_STATUSES = ["completed", "failed"]
+ARCHIVE_COUNTER_ID = "archived_orders"
+
+ORDER_ARCHIVE_AFTER_DAYS = float(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', '30'))
+
+
+async def archive_orders(db, older_than: timedelta, batch_size: int = 1000) -> int:
+    """Move terminal orders created before now - older_than into the archive.
+
+    Each batch is upserted into the archive before it is deleted from the
+    hot collection, so an interrupted run never loses orders and can simply
+    be repeated.
+    """
+    cutoff = datetime.now(timezone.utc) - older_than
+    query = {"status": {"$in": ARCHIVABLE_STATUSES}, "created_at": {"$lt": cutoff}}
+    archive = db[ARCHIVE_COLLECTION]
+    moved = 0
+
+    while True:
+        orders = await db.topup_orders.find(query).limit(batch_size).to_list(batch_size)
+        if not orders:
+            break
+
+        ids_by_status: Dict[str, List[Any]] = defaultdict(list)
+        for order in orders:
+            ids_by_status[order["status"]].append(order.pop("_id"))
+        archived_at = datetime.now(timezone.utc)
+        await archive.bulk_write(
+            [
+                ReplaceOne({"order_id": order["order_id"]}, {**order, "archived_at": archived_at}, upsert=True)
+                for order in orders
+            ],
+            ordered=False
+        )
+        # Only delete orders still in the status they were archived with; one
+        # may have been retried meanwhile. Deleting per status attributes each
+        # deletion to this run, so a concurrent archiver that removed the same
+        # orders first does not get them counted twice.
+        counts = {}
+        for status, ids in ids_by_status.items():
+            result = await db.topup_orders.delete_many({"_id": {"$in": ids}, "status": status})
+            if result.deleted_count:
+                counts[status] = result.deleted_count
+
+        all_ids = [_id for ids in ids_by_status.values() for _id in ids]
+        still_hot = await db.topup_orders.distinct("order_id", {"_id": {"$in": all_ids}})
+        if still_hot:
+            await archive.delete_many({"order_id": {"$in": still_hot}})
+
+        if counts:
+            await db.order_counters.update_one(
+                {"_id": ARCHIVE_COUNTER_ID},
+                {"$inc": counts},
+                upsert=True
+            )
+
+        moved += sum(counts.values())
+        logger.info(f"Archived {moved} orders so far")
+
+    if moved:
+        logger.info(f"Archived {moved} orders created before {cutoff.isoformat()}")
+    return moved
+
+
+async def find_archived_order(db, order_id: str) -> Optional[Dict[str, Any]]:
+    return await db[ARCHIVE_COLLECTION].find_one({"order_id": order_id}, {"_id": 0, "archived_at": 0})
+
+
+async def restore_order(db, order_id: str) -> Optional[Dict[str, Any]]:
+    """Move an archived order back into topup_orders, e.g. to retry it.
+
+    Returns None if the order is not archived, or if it is still in
+    topup_orders because archive_orders is midway through moving it. The
+    hot copy then wins: once it leaves its terminal status, the archiver
+    leaves it in place and drops the archive copy.
+    """
+    order = await db[ARCHIVE_COLLECTION].find_one({"order_id": order_id}, {"archived_at": 0})
+    if not order:
+        return None
+
+    archive_id = order.pop("_id")
+    if await db.topup_orders.find_one({"order_id": order_id}, {"_id": 1}):
+        return None
+    try:
+        await db.topup_orders.insert_one(dict(order))
+    except DuplicateKeyError:
+        return None
+
+    result = await db[ARCHIVE_COLLECTION].delete_one({"_id": archive_id})
+    if result.deleted_count:
+        await db.order_counters.update_one(
+            {"_id": ARCHIVE_COUNTER_ID},
+            {"$inc": {order["status"]: -1}}
+        )
+
+    return order
+
+
+async def archived_counts(db) -> Dict[str, int]:
+    """Per-status counts of archived orders"""
+    doc = await db.order_counters.find_one({"_id": ARCHIVE_COUNTER_ID}, {"_id": 0})
+    return doc or {}
+
+
+async def main(older_than_days: float, batch_size: int):
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        await archive_orders(client[os.environ['DB_NAME']], timedelta(days=older_than_days), batch_size)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Move old terminal orders into the archive collection")
+    parser.add_argument("--older-than-days", type=float, default=ORDER_ARCHIVE_AFTER_DAYS,
+                        help="Archive completed/failed orders created more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Orders moved per batch")
+    args = parser.parse_args()
+    asyncio.run(main(args.older_than_days, args.batch_size))
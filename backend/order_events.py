@@ -0,0 +1,131 @@
+"""
+Order status event bus for the dashboard live stream.
+
+Subscribers (one per open /automation/events connection) get their own
+bounded queue. Events are published either from a MongoDB change stream
+on topup_orders, when the deployment supports it (replica set or
+sharded cluster), or directly by the API process when running against a
+standalone mongod or while a failed change stream is being reopened.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Slow consumers lose events rather than growing memory without bound
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Seconds between attempts to reopen a failed change stream
+RESTART_DELAY_MIN = 1.0
+RESTART_DELAY_MAX = 60.0
+
+# Standalone mongod: $changeStream is only supported on replica sets
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573}
+# ChangeStreamHistoryLost and ChangeStreamFatalError: the resume token is unusable
+CHANGE_STREAM_HISTORY_LOST_CODES = {280, 286}
+
+
+class OrderEventBus:
+    """In-process fan-out of order events to live subscribers"""
+
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        # True while a change stream is feeding the bus; the API then stops
+        # publishing its own writes so events are not delivered twice
+        self.change_stream_active = False
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event: Dict[str, Any]):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Dropping order event for slow subscriber")
+
+
+def order_event(order: Dict[str, Any], previous_status: Optional[str], stats_delta: Optional[Dict[str, int]]) -> Dict[str, Any]:
+    """Shape a published event.
+
+    stats_delta maps stat keys (as returned by /automation/stats) to the
+    amount they changed by, or is None when the change is not known and
+    the client should re-read the stats instead.
+    """
+    return {
+        "type": "order",
+        "order": order,
+        "previous_status": previous_status,
+        "stats_delta": stats_delta,
+    }
+
+
+def status_delta(previous_status: Optional[str], status: str) -> Dict[str, int]:
+    """Stat counter changes caused by an order moving between statuses"""
+    if previous_status is None:
+        return {"total_orders": 1, status: 1}
+    if previous_status == status:
+        return {}
+    return {previous_status: -1, status: 1}
+
+
+async def watch_change_stream(collection, bus: OrderEventBus):
+    """Feed the bus from a change stream until cancelled.
+
+    Returns quietly if the server does not support change streams, leaving
+    the API to publish its own writes. Any other error falls back to
+    in-process events while the stream is reopened with backoff, resuming
+    after the last change seen.
+    """
+    pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}]
+    resume_token = None
+    delay = RESTART_DELAY_MIN
+    while True:
+        try:
+            async with collection.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                bus.change_stream_active = True
+                delay = RESTART_DELAY_MIN
+                logger.info("Order events driven by MongoDB change stream")
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    publish_change(bus, change)
+        except OperationFailure as e:
+            if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                logger.info(f"Change streams unavailable ({e.code}), using in-process order events")
+                return
+            if e.code in CHANGE_STREAM_HISTORY_LOST_CODES:
+                # The oplog no longer reaches the token; start from now instead
+                resume_token = None
+            logger.error(f"Order change stream failed ({e.code}), restarting in {delay:.0f}s: {str(e)}")
+        except Exception as e:
+            logger.error(f"Order change stream stopped, restarting in {delay:.0f}s: {str(e)}")
+        finally:
+            bus.change_stream_active = False
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, RESTART_DELAY_MAX)
+
+
+def publish_change(bus: OrderEventBus, change: Dict[str, Any]):
+    order = change.get("fullDocument")
+    if not order:
+        return
+    order.pop("_id", None)
+
+    if change["operationType"] == "insert":
+        bus.publish(order_event(order, None, status_delta(None, order["status"])))
+        return
+
+    updated = change.get("updateDescription", {}).get("updatedFields", {})
+    if change["operationType"] == "replace" or "status" in updated:
+        # The previous status is not part of the change event
+        bus.publish(order_event(order, None, None))
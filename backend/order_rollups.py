@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Time-bucketed order rollups for success-rate trends.
+
+Each order status transition increments a counter in an hourly and a
+daily bucket document in order_rollups, so trend queries read one small
+document per bucket instead of scanning order history. Bucket counters
+count transitions, not orders: a retried order that fails twice adds
+two failures.
+
+Rollups only cover transitions recorded after they were introduced. To
+rebuild them from existing orders, including archived ones:
+    python order_rollups.py --rebuild
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "order_rollups"
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+TERMINAL_STATUSES = ["completed", "failed", "manual_pending"]
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    at = at.astimezone(timezone.utc)
+    if granularity == "day":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def bucket_update(granularity: str, bucket: datetime, counts: Dict[str, int], replace: bool = False) -> UpdateOne:
+    operator = "$set" if replace else "$inc"
+    return UpdateOne(
+        {"granularity": granularity, "bucket": bucket},
+        {operator: {f"counts.{key}": value for key, value in counts.items()}},
+        upsert=True
+    )
+
+
+async def record_transition(db, status: str, at: datetime, created: bool = False):
+    """Count an order entering ``status`` (and optionally being created) at ``at``"""
+    counts = {status: 1}
+    if created:
+        counts["created"] = 1
+    await db[ROLLUP_COLLECTION].bulk_write(
+        [bucket_update(granularity, bucket_start(at, granularity), counts) for granularity in GRANULARITIES],
+        ordered=False
+    )
+
+
+def finished_success_rate(counts: Dict[str, int]) -> float:
+    """Percentage of the orders that finished in a bucket that completed.
+
+    Unlike /automation/stats success_rate (completed over all orders), orders
+    still queued or processing do not count, since a bucket's counters record
+    when orders finish rather than when they were created.
+    """
+    finished = sum(counts.get(status, 0) for status in TERMINAL_STATUSES)
+    return round((counts.get("completed", 0) / finished * 100) if finished > 0 else 0, 2)
+
+
+async def timeseries(db, granularity: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Buckets in [start, end), oldest first, with a finished success rate per bucket"""
+    cursor = db[ROLLUP_COLLECTION].find(
+        {"granularity": granularity, "bucket": {"$gte": bucket_start(start, granularity), "$lt": end}},
+        {"_id": 0, "bucket": 1, "counts": 1}
+    ).sort("bucket", 1)
+
+    buckets = []
+    async for doc in cursor:
+        counts = doc.get("counts", {})
+        buckets.append({"bucket": doc["bucket"], "counts": counts, "finished_success_rate": finished_success_rate(counts)})
+    return buckets
+
+
+async def rebuild(db, collections: List[str]) -> int:
+    """Recompute all buckets from order documents, overwriting existing counters.
+
+    Only the creation time and the final outcome of each order are known
+    from the documents, so intermediate transitions are not reconstructed.
+    Requires MongoDB 5.0+ for $dateTrunc.
+    """
+    totals: Dict[tuple, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    for collection_name in collections:
+        for granularity in GRANULARITIES:
+            created = db[collection_name].aggregate([
+                {"$match": {"created_at": {"$type": "date"}}},
+                {"$group": {"_id": {"$dateTrunc": {"date": "$created_at", "unit": granularity}}, "n": {"$sum": 1}}},
+            ])
+            async for row in created:
+                totals[(granularity, row["_id"])]["created"] += row["n"]
+
+            finished = db[collection_name].aggregate([
+                {"$match": {"status": {"$in": TERMINAL_STATUSES}, "completed_at": {"$type": "date"}}},
+                {"$group": {
+                    "_id": {"bucket": {"$dateTrunc": {"date": "$completed_at", "unit": granularity}}, "status": "$status"},
+                    "n": {"$sum": 1}
+                }},
+            ])
+            async for row in finished:
+                totals[(granularity, row["_id"]["bucket"])][row["_id"]["status"]] += row["n"]
+
+    await db[ROLLUP_COLLECTION].delete_many({})
+    operations = [
+        bucket_update(granularity, bucket, dict(counts), replace=True)
+        for (granularity, bucket), counts in totals.items()
+    ]
+    for i in range(0, len(operations), 1000):
+        await db[ROLLUP_COLLECTION].bulk_write(operations[i:i + 1000], ordered=False)
+
+    logger.info(f"Rebuilt {len(operations)} rollup buckets")
+    return len(operations)
+
+
+async def main():
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    try:
+        await rebuild(client[os.environ['DB_NAME']], ["topup_orders", "topup_orders_archive"])
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description="Maintain order success-rate rollups")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all buckets from order documents")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("nothing to do, pass --rebuild")
+    asyncio.run(main())
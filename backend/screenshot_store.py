@@ -0,0 +1,174 @@
+"""
+Content-addressed storage for automation screenshots.
+
+Raw PNG captures written by the automation scripts are recompressed
+(WebP, or JPEG where Pillow lacks WebP support), given a small thumbnail
+for the order list, and stored under the SHA-256 of their contents.
+Because a screenshot ID always refers to the same bytes, served files
+can be cached by clients indefinitely.
+
+Disk use is bounded by an age limit and a total size limit, enforced by
+evict(), which the API runs periodically.
+"""
+
+import logging
+import os
+import re
+import time
+from hashlib import sha256
+from io import BytesIO
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is optional; images are then stored as captured
+    Image = None
+    features = None
+
+logger = logging.getLogger(__name__)
+
+SCREENSHOT_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+MEDIA_TYPES = {
+    ".webp": "image/webp",
+    ".jpg": "image/jpeg",
+    ".png": "image/png",
+}
+
+
+class ScreenshotStore:
+    """Recompresses, thumbnails, serves and evicts screenshots"""
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        max_age_seconds: float,
+        quality: int = 80,
+        thumbnail_width: int = 320,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.quality = quality
+        self.thumbnail_width = thumbnail_width
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        if Image is not None and features.check("webp"):
+            self.format, self.extension = "WEBP", ".webp"
+        elif Image is not None:
+            self.format, self.extension = "JPEG", ".jpg"
+        else:
+            logger.warning("Pillow not installed, screenshots are stored without recompression")
+            self.format, self.extension = None, ".png"
+
+    def ingest(self, source_path: str, remove_source: bool = True) -> Optional[str]:
+        """Store a captured screenshot and return its ID, or None if unreadable"""
+        source = Path(source_path)
+        try:
+            raw = source.read_bytes()
+        except OSError as e:
+            logger.warning(f"Screenshot {source_path} could not be read: {str(e)}")
+            return None
+
+        screenshot_id = sha256(raw).hexdigest()[:32]
+        if self.path_for(screenshot_id) is None:
+            try:
+                full, thumbnail = self._encode(raw)
+            except Exception as e:
+                # Nothing evicts files outside the store, so drop the unusable capture too
+                logger.warning(f"Screenshot {source_path} could not be encoded, discarding it: {str(e)}")
+                if remove_source:
+                    self._remove(source)
+                return None
+            self._write(self.root / f"{screenshot_id}{self.extension}", full)
+            self._write(self.root / f"{screenshot_id}_thumb{self.extension}", thumbnail)
+
+        if remove_source:
+            self._remove(source)
+
+        return screenshot_id
+
+    def ingest_many(self, source_paths: List[str]) -> List[str]:
+        """Store several screenshots, dropping any that cannot be read"""
+        ids = [self.ingest(path) for path in source_paths if path]
+        return [screenshot_id for screenshot_id in ids if screenshot_id]
+
+    def path_for(self, screenshot_id: str, thumbnail: bool = False) -> Optional[Path]:
+        """Locate a stored file, or None for unknown or malformed IDs"""
+        if not SCREENSHOT_ID_PATTERN.match(screenshot_id):
+            return None
+        suffix = "_thumb" if thumbnail else ""
+        # Files written before a format change keep their original extension
+        for extension in MEDIA_TYPES:
+            path = self.root / f"{screenshot_id}{suffix}{extension}"
+            if path.exists():
+                return path
+        return None
+
+    def evict(self) -> int:
+        """Delete files past the age limit, then oldest-first down to the size limit"""
+        entries: List[Tuple[float, int, Path]] = []
+        for path in self.root.iterdir():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        cutoff = time.time() - self.max_age_seconds
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"Evicted {removed} screenshot files, {total} bytes remain")
+        return removed
+
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _encode(self, raw: bytes) -> Tuple[bytes, bytes]:
+        if self.format is None:
+            return raw, raw
+
+        with Image.open(BytesIO(raw)) as image:
+            image = image.convert("RGB")
+            full = self._save(image)
+
+            height = max(1, round(image.height * self.thumbnail_width / image.width))
+            image.thumbnail((self.thumbnail_width, height))
+            thumbnail = self._save(image)
+
+        return full, thumbnail
+
+    def _save(self, image) -> bytes:
+        buffer = BytesIO()
+        image.save(buffer, format=self.format, quality=self.quality)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        # Write then rename so readers never see a partial file
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+
+def media_type_for(path: Path) -> str:
+    return MEDIA_TYPES.get(path.suffix, "application/octet-stream")
@@ -1,27 +1,56 @@
-from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException
+from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import asyncio
+import base64
+import csv
+import io
+import json
+import orjson
+import re
+import time
 
+from db_indexes import ensure_indexes
+from order_events import OrderEventBus, order_event, status_delta, watch_change_stream
+from screenshot_store import ScreenshotStore, media_type_for
+from automation_logs import AutomationLogSink
+from metrics import MongoCommandListener, metrics_middleware, metrics_response
+from order_rollups import GRANULARITIES, record_transition, timeseries
+from order_archive import ORDER_ARCHIVE_AFTER_DAYS, archive_orders, archived_counts, find_archived_order, restore_order
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[MongoCommandListener()])
 db = client[os.environ['DB_NAME']]
 
+# Screenshot storage
+screenshot_store = ScreenshotStore(
+    root=Path(os.environ.get('SCREENSHOT_STORE_DIR', '/tmp/garena_screenshots/store')),
+    max_bytes=int(os.environ.get('SCREENSHOT_MAX_BYTES', str(1024 ** 3))),
+    max_age_seconds=float(os.environ.get('SCREENSHOT_MAX_AGE_DAYS', '14')) * 86400,
+)
+SCREENSHOT_EVICT_INTERVAL = 3600
+
+# Order archival
+ORDER_ARCHIVE_INTERVAL = 3600
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -38,6 +67,10 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class StatusCheckPage(BaseModel):
+    status_checks: List[StatusCheck]
+    next_cursor: Optional[str] = None
+
 # Garena Automation Models
 class TopUpRequest(BaseModel):
     player_uid: str = Field(..., description="Free Fire Player UID")
@@ -57,6 +90,35 @@ class TopUpResponse(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     completed_at: Optional[datetime] = None
 
+# Largest number of order IDs accepted by the bulk lookup endpoint
+MAX_BULK_LOOKUP = 500
+
+class BulkOrderLookupRequest(BaseModel):
+    order_ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_LOOKUP)
+
+class BulkOrderResult(BaseModel):
+    order_id: str
+    found: bool
+    order: Optional[TopUpResponse] = None
+
+class BulkOrderLookupResponse(BaseModel):
+    results: List[BulkOrderResult]
+
+class OrderSummary(BaseModel):
+    """List view of an order; message and screenshots come from the detail endpoint"""
+    order_id: str
+    status: str
+    player_uid: str
+    diamond_amount: int
+    error: Optional[str] = None
+    screenshot_count: int = 0
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+class OrderPage(BaseModel):
+    orders: List[OrderSummary]
+    next_cursor: Optional[str] = None
+
 class AutomationLog(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -66,6 +128,207 @@ class AutomationLog(BaseModel):
     message: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class StatsBucket(BaseModel):
+    bucket: datetime
+    counts: Dict[str, int]
+    finished_success_rate: float
+
+class StatsTimeseries(BaseModel):
+    granularity: str
+    buckets: List[StatsBucket]
+
+class AutomationLogPage(BaseModel):
+    logs: List[AutomationLog]
+    next_cursor: Optional[str] = None
+
+# ===== AUTOMATION LOG HELPERS =====
+
+# Per-order diagnostics, written to automation_logs in batches
+automation_logs = AutomationLogSink(db.automation_logs)
+
+LOG_LEVELS = {"info": "info", "debug": "info", "warn": "warning", "warning": "warning", "error": "error"}
+
+def log_order(order_id: str, log_level: str, message: str, timestamp: Optional[datetime] = None):
+    """Record a diagnostic line against an order"""
+    entry = AutomationLog(order_id=order_id, log_level=log_level, message=message)
+    if timestamp:
+        entry.timestamp = timestamp
+    automation_logs.add(entry.model_dump())
+
+def record_script_logs(order_id: str, output: str):
+    """Store the JSON log lines the Node.js automation writes to stderr"""
+    for line in output.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+            log_order(
+                order_id,
+                LOG_LEVELS.get(str(entry.get("level", "info")).lower(), "info"),
+                entry["message"],
+                datetime.fromisoformat(entry["timestamp"].replace("Z", "+00:00"))
+            )
+        except (ValueError, KeyError, TypeError, AttributeError):
+            log_order(order_id, "warning", line)
+
+# ===== ORDER STATE HELPERS =====
+
+ORDER_STATUSES = ["completed", "failed", "manual_pending", "processing", "queued"]
+
+# Short-lived in-process cache for /automation/stats, dropped on any status change
+STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', '5'))
+_stats_cache: Dict[str, Any] = {"value": None, "expires_at": 0.0, "version": None}
+
+def invalidate_stats_cache():
+    _stats_cache["value"] = None
+    _stats_cache["expires_at"] = 0.0
+
+# Bumped on every order write; order and stats ETags are derived from it
+ORDERS_VERSION_ID = "orders_version"
+
+async def bump_orders_version():
+    await db.order_counters.update_one({"_id": ORDERS_VERSION_ID}, {"$inc": {"version": 1}}, upsert=True)
+
+async def orders_version() -> int:
+    doc = await db.order_counters.find_one({"_id": ORDERS_VERSION_ID})
+    return doc["version"] if doc else 0
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak If-None-Match comparison, as used for GET revalidation"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+# Live order events for /automation/events subscribers
+order_events = OrderEventBus()
+
+async def record_rollup(status: str, at: datetime, created: bool = False):
+    """Count a status transition in the time-bucketed rollups"""
+    try:
+        await record_transition(db, status, at, created=created)
+    except Exception as e:
+        logger.error(f"Failed to update order rollups: {str(e)}")
+
+def publish_order_change(order: Dict[str, Any], previous_status: Optional[str]):
+    """Publish an order write, unless a change stream is already doing so"""
+    if order_events.change_stream_active:
+        return
+    order_events.publish(order_event(order, previous_status, status_delta(previous_status, order["status"])))
+
+async def update_order(order_id: str, fields: Dict[str, Any]) -> bool:
+    """Apply a $set to an order and propagate status changes to stats and live events.
+
+    Returns whether the order was found in topup_orders.
+    """
+    if "status" not in fields:
+        result = await db.topup_orders.update_one({"order_id": order_id}, {"$set": fields})
+        await bump_orders_version()
+        return result.matched_count > 0
+    
+    previous = await db.topup_orders.find_one_and_update(
+        {"order_id": order_id},
+        {"$set": fields},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    await bump_orders_version()
+    invalidate_stats_cache()
+    if previous:
+        if previous["status"] != fields["status"]:
+            await record_rollup(fields["status"], fields.get("updated_at") or datetime.now(timezone.utc))
+        publish_order_change({**previous, **fields}, previous["status"])
+    return previous is not None
+
+async def find_order(order_id: str) -> Optional[Dict[str, Any]]:
+    """Look an order up in the hot collection, falling back to the archive"""
+    order = await db.topup_orders.find_one({"order_id": order_id}, {"_id": 0})
+    if order is None:
+        order = await find_archived_order(db, order_id)
+    return order
+
+# ===== PAGINATION HELPERS =====
+
+# Newest first, with order_id as a tie-breaker so the sort order is total
+ORDER_SORT = [("created_at", -1), ("order_id", -1)]
+STATUS_SORT = [("timestamp", -1), ("id", -1)]
+
+# Shorter prefixes match most of the player_uid index and leave a large in-memory sort
+MIN_UID_PREFIX_LENGTH = 3
+
+def time_sort_key(value: Any) -> tuple:
+    """Sort key matching MongoDB's order for dates mixed with legacy strings"""
+    return (isinstance(value, datetime), value)
+
+def merge_order_pages(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge pages read from the hot and archive collections into ORDER_SORT order.
+
+    An order caught mid-archival is in both; the first (hot) copy is kept.
+    """
+    unique = {}
+    for order in orders:
+        unique.setdefault(order["order_id"], order)
+    return sorted(unique.values(), key=lambda o: (time_sort_key(o["created_at"]), o["order_id"]), reverse=True)
+
+# Fields returned by list endpoints, matching OrderSummary
+ORDER_LIST_PROJECTION = {
+    "_id": 0,
+    "order_id": 1,
+    "status": 1,
+    "player_uid": 1,
+    "diamond_amount": 1,
+    "error": 1,
+    "screenshot_count": {"$size": {"$ifNull": ["$screenshots", []]}},
+    "created_at": 1,
+    "completed_at": 1,
+}
+
+def encode_cursor(doc: Dict[str, Any], sort: List[tuple]) -> str:
+    """Build an opaque keyset cursor from the last document on a page.
+
+    ``sort`` is a (datetime field, unique tie-breaker field) pair, as used
+    for the page query. Timestamps still stored as ISO strings (see
+    migrate_datetimes.py) are kept as strings, flagged with "s".
+    """
+    (time_field, _), (key_field, _) = sort
+    time_value = doc[time_field]
+    if isinstance(time_value, str):
+        fields = {"c": time_value, "o": doc[key_field], "s": 1}
+    else:
+        fields = {"c": time_value.isoformat(), "o": doc[key_field]}
+    payload = json.dumps(fields, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: List[tuple]) -> Dict[str, Any]:
+    """Turn a cursor back into a query matching everything after it in ``sort``"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        legacy = bool(payload.get("s"))
+        time_value = payload["c"] if legacy else datetime.fromisoformat(payload["c"])
+        key_value = payload["o"]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    (time_field, direction), (key_field, _) = sort
+    op = "$lt" if direction == -1 else "$gt"
+    clauses = [
+        {time_field: {op: time_value}},
+        {time_field: time_value, key_field: {op: key_value}},
+    ]
+    # Comparisons only match values of the same BSON type, and strings sort
+    # before dates, so unmigrated string timestamps need their own clause
+    if direction == -1 and not legacy:
+        clauses.append({time_field: {"$type": "string"}})
+    elif direction == 1 and legacy:
+        clauses.append({time_field: {"$type": "date"}})
+    return {"$or": clauses}
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
@@ -76,24 +339,35 @@ async def create_status_check(input: StatusCheckCreate):
     status_dict = input.model_dump()
     status_obj = StatusCheck(**status_dict)
     
-    # Convert to dict and serialize datetime to ISO string for MongoDB
-    doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    
-    _ = await db.status_checks.insert_one(doc)
+    _ = await db.status_checks.insert_one(status_obj.model_dump())
     return status_obj
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
+@api_router.get("/status", response_model=StatusCheckPage)
+async def get_status_checks(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """List status checks in [start, end), newest first"""
+    query: Dict[str, Any] = {}
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = start
+        if end:
+            query["timestamp"]["$lt"] = end
+    if cursor:
+        query.update(decode_cursor(cursor, STATUS_SORT))
+    
+    status_checks = await db.status_checks.find(query, {"_id": 0}).sort(STATUS_SORT).limit(limit + 1).to_list(limit + 1)
     
-    # Convert ISO string timestamps back to datetime objects
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
+    next_cursor = None
+    if len(status_checks) > limit:
+        status_checks = status_checks[:limit]
+        next_cursor = encode_cursor(status_checks[-1], STATUS_SORT)
     
-    return status_checks
+    return {"status_checks": status_checks, "next_cursor": next_cursor}
 
 # ===== GARENA AUTOMATION ENDPOINTS =====
 
@@ -101,28 +375,34 @@ async def run_automation_task(order_id: str, player_uid: str, diamond_amount: in
     """Background task to run Garena automation - Now using Node.js/Puppeteer"""
     try:
         # Update order status to processing
-        await db.topup_orders.update_one(
-            {"order_id": order_id},
-            {"$set": {"status": "processing", "updated_at": datetime.now(timezone.utc).isoformat()}}
+        await update_order(
+            order_id,
+            {"status": "processing", "updated_at": datetime.now(timezone.utc)}
         )
         
         # Run Node.js Puppeteer automation
-        import subprocess
-        import json
-        
         script_path = os.path.join(os.path.dirname(__file__), 'garena_puppeteer.js')
         config_json = json.dumps({"playerUid": player_uid, "diamondAmount": diamond_amount})
         
         logger.info(f"Running Node.js automation for order {order_id}")
+        log_order(order_id, "info", "Automation started")
         
-        process = subprocess.Popen(
-            ['node', script_path, config_json],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+        # Run without blocking the event loop, so the processing event above
+        # reaches live subscribers while the script is still running
+        process = await asyncio.create_subprocess_exec(
+            'node', script_path, config_json,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
             cwd=os.path.dirname(__file__)
         )
         
-        stdout, stderr = process.communicate(timeout=900)  # 15 min timeout
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=900)  # 15 min timeout
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        record_script_logs(order_id, stderr.decode('utf-8', errors='replace'))
         
         # Parse result from Node.js
         try:
@@ -135,50 +415,55 @@ async def run_automation_task(order_id: str, player_uid: str, diamond_amount: in
                 "screenshots": []
             }
         
+        # Recompress captures into the screenshot store; orders keep only the IDs
+        screenshots = await asyncio.to_thread(
+            screenshot_store.ingest_many, result.get("screenshots", [])
+        )
+        
         # Update order with result
         update_data = {
             "status": "completed" if result["success"] else "failed",
             "message": result["message"],
-            "screenshots": result.get("screenshots", []),
+            "screenshots": screenshots,
             "error": result.get("error"),
-            "completed_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "completed_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc)
         }
         
         # If CAPTCHA or manual intervention needed, set to manual_pending
         if result.get("error") in ["otp_required", "captcha_failed", "login_failed", "insufficient_balance"]:
             update_data["status"] = "manual_pending"
         
-        await db.topup_orders.update_one(
-            {"order_id": order_id},
-            {"$set": update_data}
-        )
+        await update_order(order_id, update_data)
         
         logger.info(f"Order {order_id} completed with status: {update_data['status']}")
+        log_order(order_id, "info" if result["success"] else "error", f"Automation finished with status {update_data['status']}: {result['message']}")
         
-    except subprocess.TimeoutExpired:
+    except asyncio.TimeoutError:
         logger.error(f"Automation task timed out for order {order_id}")
-        await db.topup_orders.update_one(
-            {"order_id": order_id},
-            {"$set": {
+        log_order(order_id, "error", "Automation timed out after 15 minutes")
+        await update_order(
+            order_id,
+            {
                 "status": "failed",
                 "error": "timeout",
                 "message": "Automation timed out after 15 minutes",
-                "completed_at": datetime.now(timezone.utc).isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
+                "completed_at": datetime.now(timezone.utc),
+                "updated_at": datetime.now(timezone.utc)
+            }
         )
     except Exception as e:
         logger.error(f"Automation task failed for order {order_id}: {str(e)}")
-        await db.topup_orders.update_one(
-            {"order_id": order_id},
-            {"$set": {
+        log_order(order_id, "error", f"Automation exception: {str(e)}")
+        await update_order(
+            order_id,
+            {
                 "status": "failed",
                 "error": str(e),
                 "message": f"Automation exception: {str(e)}",
-                "completed_at": datetime.now(timezone.utc).isoformat(),
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
+                "completed_at": datetime.now(timezone.utc),
+                "updated_at": datetime.now(timezone.utc)
+            }
         )
 
 @api_router.post("/automation/topup", response_model=TopUpResponse)
@@ -195,9 +480,11 @@ async def trigger_topup(request: TopUpRequest, background_tasks: BackgroundTasks
         )
         
         # Save to database
-        order_dict = order.model_dump()
-        order_dict['created_at'] = order_dict['created_at'].isoformat()
-        await db.topup_orders.insert_one(order_dict)
+        await db.topup_orders.insert_one(order.model_dump())
+        await bump_orders_version()
+        invalidate_stats_cache()
+        await record_rollup(order.status, order.created_at, created=True)
+        publish_order_change(order.model_dump(), None)
         
         # Add background task to run automation
         background_tasks.add_task(
@@ -208,50 +495,216 @@ async def trigger_topup(request: TopUpRequest, background_tasks: BackgroundTasks
         )
         
         logger.info(f"Top-up order {request.order_id} queued for UID: {request.player_uid}")
+        log_order(request.order_id, "info", f"Order queued for UID {request.player_uid}")
         return order
         
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"Order {request.order_id} already exists")
     except Exception as e:
         logger.error(f"Failed to trigger top-up: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/automation/orders", response_model=List[TopUpResponse])
-async def get_orders(status: Optional[str] = None, limit: int = 50):
-    """Get top-up orders with optional status filter"""
+@api_router.get("/automation/orders", response_model=OrderPage)
+async def get_orders(
+    request: Request,
+    status: Optional[str] = None,
+    player_uid: Optional[str] = None,
+    player_uid_prefix: Optional[str] = Query(None, min_length=MIN_UID_PREFIX_LENGTH),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_archived: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
+):
+    """Get top-up orders, newest first, optionally filtered by status,
+    player UID (exact or prefix) and creation time in [start, end).
+
+    Archived orders are included when ``include_archived`` is set, which
+    is the default for player UID lookups so a customer's older history
+    is found. Pass the returned next_cursor back as ``cursor`` to fetch
+    the following page.
+    """
+    if player_uid and player_uid_prefix:
+        raise HTTPException(status_code=400, detail="Pass either player_uid or player_uid_prefix, not both")
+    
     try:
-        query = {}
+        etag = f'W/"orders-{await orders_version()}"'
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        query: Dict[str, Any] = {}
         if status:
             query["status"] = status
+        if player_uid:
+            query["player_uid"] = player_uid
+        elif player_uid_prefix:
+            # Anchored and case-sensitive, so MongoDB turns it into an index range scan
+            query["player_uid"] = {"$regex": f"^{re.escape(player_uid_prefix)}"}
+        if start or end:
+            query["created_at"] = {}
+            if start:
+                query["created_at"]["$gte"] = start
+            if end:
+                query["created_at"]["$lt"] = end
+        if cursor:
+            query.update(decode_cursor(cursor, ORDER_SORT))
         
-        orders = await db.topup_orders.find(query, {"_id": 0}).sort("created_at", -1).to_list(limit)
+        if include_archived is None:
+            include_archived = bool(player_uid or player_uid_prefix)
+        collections = [db.topup_orders]
+        if include_archived:
+            collections.append(db.topup_orders_archive)
         
-        # Convert ISO strings back to datetime
-        for order in orders:
-            if isinstance(order.get('created_at'), str):
-                order['created_at'] = datetime.fromisoformat(order['created_at'])
-            if order.get('completed_at') and isinstance(order['completed_at'], str):
-                order['completed_at'] = datetime.fromisoformat(order['completed_at'])
+        # Fetch one extra row to learn whether another page exists
+        orders = []
+        for collection in collections:
+            orders += await collection.find(query, ORDER_LIST_PROJECTION).sort(ORDER_SORT).limit(limit + 1).to_list(limit + 1)
+        if len(collections) > 1:
+            orders = merge_order_pages(orders)
         
-        return orders
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = encode_cursor(orders[-1], ORDER_SORT)
+        
+        # The projection already matches OrderSummary, so skip model validation
+        # and serialize the documents directly
+        return ORJSONResponse(
+            {"orders": orders, "next_cursor": next_cursor},
+            headers={"ETag": etag, "Cache-Control": "no-cache"}
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get orders: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+EXPORT_FIELDS = ["order_id", "status", "player_uid", "diamond_amount", "message", "error", "screenshots", "created_at", "completed_at"]
+# Rows per chunk written to the response; the cursor batch size matches it
+EXPORT_CHUNK_ROWS = 500
+
+# Oldest first, with order_id as a tie-breaker so copies of one order are adjacent
+EXPORT_SORT = [("created_at", 1), ("order_id", 1)]
+
+async def merge_sorted_orders(cursors) -> AsyncIterator[Dict[str, Any]]:
+    """Merge cursors sorted by EXPORT_SORT into one stream in the same order.
+
+    An order caught mid-archival is upserted into the archive before it is
+    deleted from topup_orders, so it can be in both; only its first copy
+    is yielded.
+    """
+    async def next_or_none(cursor):
+        try:
+            return await cursor.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    heads = [await next_or_none(cursor) for cursor in cursors]
+    last_order_id = None
+    while True:
+        live = [i for i, head in enumerate(heads) if head is not None]
+        if not live:
+            return
+        i = min(live, key=lambda i: (time_sort_key(heads[i]["created_at"]), heads[i]["order_id"]))
+        order = heads[i]
+        heads[i] = await next_or_none(cursors[i])
+        
+        if order["order_id"] == last_order_id:
+            continue
+        last_order_id = order["order_id"]
+        yield order
+
+def export_csv_row(order: Dict[str, Any]) -> List[Any]:
+    row = []
+    for field in EXPORT_FIELDS:
+        value = order.get(field)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, list):
+            value = " ".join(value)
+        row.append("" if value is None else value)
+    return row
+
+# Declared before /automation/orders/{order_id} so "export" is not taken as an order ID
+@api_router.get("/automation/orders/export")
+async def export_orders(
+    format: str = "ndjson",
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_archived: bool = True
+):
+    """Stream orders as NDJSON or CSV, oldest first, without buffering the result"""
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    
+    query: Dict[str, Any] = {}
+    if status:
+        query["status"] = status
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = start
+        if end:
+            query["created_at"]["$lt"] = end
+    
+    collections = [db.topup_orders]
+    if include_archived:
+        collections.append(db.topup_orders_archive)
+    cursors = [
+        collection.find(query, {"_id": 0, "archived_at": 0}).sort(EXPORT_SORT).batch_size(EXPORT_CHUNK_ROWS)
+        for collection in collections
+    ]
+    
+    async def rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        lines: List[bytes] = []
+        if format == "csv":
+            writer.writerow(EXPORT_FIELDS)
+        
+        pending = 0
+        async for order in merge_sorted_orders(cursors):
+            if format == "csv":
+                writer.writerow(export_csv_row(order))
+            else:
+                lines.append(orjson.dumps(order, option=orjson.OPT_APPEND_NEWLINE))
+            pending += 1
+            
+            if pending >= EXPORT_CHUNK_ROWS:
+                yield buffer.getvalue() if format == "csv" else b"".join(lines)
+                buffer.seek(0)
+                buffer.truncate()
+                lines.clear()
+                pending = 0
+        
+        if pending or buffer.tell():
+            yield buffer.getvalue() if format == "csv" else b"".join(lines)
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"orders.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @api_router.get("/automation/orders/{order_id}", response_model=TopUpResponse)
-async def get_order(order_id: str):
+async def get_order(order_id: str, request: Request, response: Response):
     """Get specific order details"""
     try:
-        order = await db.topup_orders.find_one({"order_id": order_id}, {"_id": 0})
+        etag = f'W/"orders-{await orders_version()}"'
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        
+        order = await find_order(order_id)
         
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
         
-        # Convert ISO strings back to datetime
-        if isinstance(order.get('created_at'), str):
-            order['created_at'] = datetime.fromisoformat(order['created_at'])
-        if order.get('completed_at') and isinstance(order['completed_at'], str):
-            order['completed_at'] = datetime.fromisoformat(order['completed_at'])
-        
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
         return order
         
     except HTTPException:
@@ -260,11 +713,35 @@ async def get_order(order_id: str):
         logger.error(f"Failed to get order: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/automation/orders/lookup", response_model=BulkOrderLookupResponse)
+async def lookup_orders(request: BulkOrderLookupRequest):
+    """Resolve many order IDs at once, in request order, with explicit not-found entries"""
+    try:
+        wanted = list(dict.fromkeys(request.order_ids))
+        found = {
+            order["order_id"]: order
+            async for order in db.topup_orders.find({"order_id": {"$in": wanted}}, {"_id": 0})
+        }
+        
+        missing = [order_id for order_id in wanted if order_id not in found]
+        if missing:
+            async for order in db.topup_orders_archive.find({"order_id": {"$in": missing}}, {"_id": 0, "archived_at": 0}):
+                found[order["order_id"]] = order
+        
+        return {"results": [
+            {"order_id": order_id, "found": order_id in found, "order": found.get(order_id)}
+            for order_id in request.order_ids
+        ]}
+        
+    except Exception as e:
+        logger.error(f"Failed to look up orders: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.post("/automation/orders/{order_id}/retry")
 async def retry_order(order_id: str, background_tasks: BackgroundTasks):
     """Retry a failed or manual_pending order"""
     try:
-        order = await db.topup_orders.find_one({"order_id": order_id}, {"_id": 0})
+        order = await find_order(order_id)
         
         if not order:
             raise HTTPException(status_code=404, detail="Order not found")
@@ -272,15 +749,28 @@ async def retry_order(order_id: str, background_tasks: BackgroundTasks):
         if order["status"] not in ["failed", "manual_pending"]:
             raise HTTPException(status_code=400, detail="Only failed or manual_pending orders can be retried")
         
-        # Update status to queued
-        await db.topup_orders.update_one(
-            {"order_id": order_id},
-            {"$set": {
-                "status": "queued",
-                "message": "Order re-queued for retry",
-                "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        # Archived orders come back into the hot collection to be worked on.
+        # The archiver can move the order between the lookup and the update,
+        # so restore it again if the update finds nothing; queuing the task
+        # for an order outside topup_orders would lose its result.
+        for _ in range(2):
+            if await restore_order(db, order_id):
+                await bump_orders_version()
+                invalidate_stats_cache()
+            
+            # Update status to queued
+            queued = await update_order(
+                order_id,
+                {
+                    "status": "queued",
+                    "message": "Order re-queued for retry",
+                    "updated_at": datetime.now(timezone.utc)
+                }
+            )
+            if queued:
+                break
+        else:
+            raise HTTPException(status_code=409, detail="Order was archived while being retried, try again")
         
         # Add background task
         background_tasks.add_task(
@@ -290,6 +780,7 @@ async def retry_order(order_id: str, background_tasks: BackgroundTasks):
             order["diamond_amount"]
         )
         
+        log_order(order_id, "info", f"Order re-queued for retry from {order['status']}")
         return {"message": "Order queued for retry", "order_id": order_id}
         
     except HTTPException:
@@ -298,40 +789,183 @@ async def retry_order(order_id: str, background_tasks: BackgroundTasks):
         logger.error(f"Failed to retry order: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Largest number of buckets a single timeseries request may return
+MAX_TIMESERIES_BUCKETS = 1000
+
+@api_router.get("/automation/stats/timeseries", response_model=StatsTimeseries)
+async def get_stats_timeseries(
+    granularity: str = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    """Get per-hour or per-day order counts and success rates from the rollups"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    
+    step = GRANULARITIES[granularity]
+    end = end or datetime.now(timezone.utc)
+    start = start or end - step * (48 if granularity == "hour" else 30)
+    # Treat naive query parameters as UTC
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start) / step > MAX_TIMESERIES_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range covers more than {MAX_TIMESERIES_BUCKETS} buckets")
+    
+    try:
+        buckets = await timeseries(db, granularity, start, end)
+        return {"granularity": granularity, "buckets": buckets}
+        
+    except Exception as e:
+        logger.error(f"Failed to get stats timeseries: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Chronological, with the log id as a tie-breaker
+LOG_SORT = [("timestamp", 1), ("id", 1)]
+
+@api_router.get("/automation/orders/{order_id}/logs", response_model=AutomationLogPage)
+async def get_order_logs(
+    order_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None
+):
+    """Get automation logs for an order, oldest first"""
+    try:
+        # Make entries still sitting in the buffer visible
+        await automation_logs.flush()
+        
+        query: Dict[str, Any] = {"order_id": order_id}
+        if cursor:
+            query.update(decode_cursor(cursor, LOG_SORT))
+        
+        logs = await db.automation_logs.find(query, {"_id": 0}).sort(LOG_SORT).limit(limit + 1).to_list(limit + 1)
+        
+        next_cursor = None
+        if len(logs) > limit:
+            logs = logs[:limit]
+            next_cursor = encode_cursor(logs[-1], LOG_SORT)
+        
+        return {"logs": logs, "next_cursor": next_cursor}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get order logs: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.get("/automation/stats")
-async def get_automation_stats():
+async def get_automation_stats(request: Request, response: Response):
     """Get automation statistics"""
     try:
-        total = await db.topup_orders.count_documents({})
-        completed = await db.topup_orders.count_documents({"status": "completed"})
-        failed = await db.topup_orders.count_documents({"status": "failed"})
-        manual_pending = await db.topup_orders.count_documents({"status": "manual_pending"})
-        processing = await db.topup_orders.count_documents({"status": "processing"})
-        queued = await db.topup_orders.count_documents({"status": "queued"})
-        
-        return {
+        version = await orders_version()
+        etag = f'W/"stats-{version}"'
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        
+        # A cached value is only reused while no order has been written since,
+        # including by other API processes
+        now = time.monotonic()
+        if (_stats_cache["value"] is not None and now < _stats_cache["expires_at"]
+                and _stats_cache["version"] == version):
+            return _stats_cache["value"]
+        
+        # One pass over the collection instead of a count per status
+        counts = {status: 0 for status in ORDER_STATUSES}
+        async for row in db.topup_orders.aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]):
+            counts[row["_id"]] = row["count"]
+        
+        # Orders moved to the archive still count towards the totals
+        for status, count in (await archived_counts(db)).items():
+            counts[status] = counts.get(status, 0) + count
+        
+        total = sum(counts.values())
+        completed = counts["completed"]
+        
+        stats = {
             "total_orders": total,
             "completed": completed,
-            "failed": failed,
-            "manual_pending": manual_pending,
-            "processing": processing,
-            "queued": queued,
+            "failed": counts["failed"],
+            "manual_pending": counts["manual_pending"],
+            "processing": counts["processing"],
+            "queued": counts["queued"],
             "success_rate": round((completed / total * 100) if total > 0 else 0, 2)
         }
         
+        _stats_cache["value"] = stats
+        _stats_cache["expires_at"] = now + STATS_CACHE_TTL
+        _stats_cache["version"] = version
+        return stats
+        
     except Exception as e:
         logger.error(f"Failed to get stats: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/screenshots/{screenshot_id}")
+async def get_screenshot(screenshot_id: str, request: Request, thumbnail: bool = False):
+    """Serve a stored screenshot, or its thumbnail, with long-lived caching"""
+    path = screenshot_store.path_for(screenshot_id, thumbnail=thumbnail)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    
+    # IDs are content hashes, so a given URL never changes
+    etag = f'"{path.name}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    
+    return FileResponse(path, media_type=media_type_for(path), headers=headers)
+
+# Seconds between keep-alive comments on idle event streams
+EVENT_STREAM_HEARTBEAT = 15
+
+@api_router.get("/automation/events")
+async def stream_order_events(request: Request):
+    """Server-sent events stream of order status changes and stat deltas"""
+    queue = order_events.subscribe()
+    
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(jsonable_encoder(event))}\n\n"
+        finally:
+            order_events.unsubscribe(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Prometheus scrape endpoint, outside /api like other infrastructure endpoints
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return metrics_response()
+
+app.middleware("http")(metrics_middleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Configure logging
@@ -341,6 +975,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def build_indexes():
+    """Build missing MongoDB indexes without blocking startup"""
+    try:
+        app.state.created_indexes = await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Index migration failed: {str(e)}")
+
+async def evict_screenshots():
+    """Keep the screenshot store within its size and age limits"""
+    while True:
+        try:
+            await asyncio.to_thread(screenshot_store.evict)
+        except Exception as e:
+            logger.error(f"Screenshot eviction failed: {str(e)}")
+        await asyncio.sleep(SCREENSHOT_EVICT_INTERVAL)
+
+async def archive_old_orders():
+    """Periodically move old terminal orders out of the hot collection"""
+    while True:
+        try:
+            if await archive_orders(db, timedelta(days=ORDER_ARCHIVE_AFTER_DAYS)):
+                await bump_orders_version()
+                invalidate_stats_cache()
+        except Exception as e:
+            logger.error(f"Order archival failed: {str(e)}")
+        await asyncio.sleep(ORDER_ARCHIVE_INTERVAL)
+
+@app.on_event("startup")
+async def startup_db_client():
+    # Keep a reference so the task is not garbage collected mid-build
+    app.state.index_task = asyncio.create_task(build_indexes())
+    app.state.change_stream_task = asyncio.create_task(
+        watch_change_stream(db.topup_orders, order_events)
+    )
+    app.state.screenshot_eviction_task = asyncio.create_task(evict_screenshots())
+    app.state.automation_log_task = asyncio.create_task(automation_logs.run())
+    app.state.archive_task = asyncio.create_task(archive_old_orders())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.change_stream_task.cancel()
+    app.state.screenshot_eviction_task.cancel()
+    app.state.automation_log_task.cancel()
+    app.state.archive_task.cancel()
+    await automation_logs.flush()
     client.close()
\ No newline at end of file
@@ -1,15 +1,83 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import '@/App.css';
 import { BrowserRouter, Routes, Route, Link } from 'react-router-dom';
 import axios from 'axios';
+import OrderTable from '@/components/OrderTable';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Last response per URL, revalidated with If-None-Match so unchanged data is not re-downloaded
+const etagCache = new Map();
+
+const getWithEtag = async (url) => {
+  const cached = etagCache.get(url);
+  const response = await axios.get(url, {
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+  if (response.headers.etag) {
+    etagCache.set(url, { etag: response.headers.etag, data: response.data });
+  }
+  return response.data;
+};
+
+const ORDER_PAGE_SIZE = 50;
+
+// Matches the backend's minimum for player_uid_prefix
+const MIN_UID_PREFIX_LENGTH = 3;
+
+const EMPTY_FILTERS = { status: '', playerUid: '', uidPrefix: false, start: '', end: '' };
+
+// Date inputs give local calendar days; the end day is inclusive in the filter bar
+const localDayStart = (day, offsetDays = 0) => {
+  const date = new Date(`${day}T00:00`);
+  date.setDate(date.getDate() + offsetDays);
+  return date;
+};
+
+const orderQueryParams = (filters) => {
+  const params = {};
+  if (filters.status) params.status = filters.status;
+  if (filters.playerUid) params[filters.uidPrefix ? 'player_uid_prefix' : 'player_uid'] = filters.playerUid;
+  if (filters.start) params.start = localDayStart(filters.start).toISOString();
+  if (filters.end) params.end = localDayStart(filters.end, 1).toISOString();
+  return params;
+};
+
+// Same conditions as the backend query, for orders pushed over the event stream
+const matchesFilters = (order, filters) => {
+  if (filters.status && order.status !== filters.status) return false;
+  if (filters.playerUid) {
+    const uid = order.player_uid || '';
+    if (filters.uidPrefix ? !uid.startsWith(filters.playerUid) : uid !== filters.playerUid) return false;
+  }
+  const created = new Date(order.created_at);
+  if (filters.start && created < localDayStart(filters.start)) return false;
+  if (filters.end && created >= localDayStart(filters.end, 1)) return false;
+  return true;
+};
+
+// Orders created before the screenshot store hold raw file paths instead of IDs
+const isScreenshotId = (value) => /^[0-9a-f]{32}$/.test(value);
+
 const Home = () => {
   const [stats, setStats] = useState(null);
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(false);
+  // Cursor for the next page of order history; null once everything is loaded
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const loadingMoreRef = useRef(false);
+  // Filter bar inputs, and the filters the loaded list was queried with
+  const [filterForm, setFilterForm] = useState(EMPTY_FILTERS);
+  const [filters, setFilters] = useState(EMPTY_FILTERS);
+  const filtersRef = useRef(EMPTY_FILTERS);
+  // Full order document for the selected row; the list itself only has summaries
+  const [selectedOrder, setSelectedOrder] = useState(null);
   const [formData, setFormData] = useState({
     player_uid: '301372144',
     diamond_amount: 25
@@ -20,32 +88,121 @@ const Home = () => {
     fetchOrders();
   }, []);
 
+  // Live order updates pushed by the backend instead of re-fetching after every action
+  useEffect(() => {
+    const source = new EventSource(`${API}/automation/events`);
+    source.addEventListener('order', (e) => applyOrderEvent(JSON.parse(e.data)));
+    return () => source.close();
+  }, []);
+
+  const applyOrderEvent = ({ order, stats_delta }) => {
+    // Events carry the full order; list rows only keep the screenshot count
+    const summary = { ...order, screenshot_count: (order.screenshots || []).length };
+    const matches = matchesFilters(order, filtersRef.current);
+    setOrders((prev) => {
+      const index = prev.findIndex((o) => o.order_id === order.order_id);
+      if (!matches) {
+        return index === -1 ? prev : prev.filter((o) => o.order_id !== order.order_id);
+      }
+      if (index === -1) {
+        return [summary, ...prev];
+      }
+      const next = [...prev];
+      next[index] = { ...prev[index], ...summary };
+      return next;
+    });
+    setSelectedOrder((prev) => (
+      prev && prev.order_id === order.order_id ? { ...prev, ...order } : prev
+    ));
+
+    if (!stats_delta) {
+      fetchStats();
+      return;
+    }
+    setStats((prev) => {
+      if (!prev) return prev;
+      const next = { ...prev };
+      Object.entries(stats_delta).forEach(([key, delta]) => {
+        next[key] = (next[key] || 0) + delta;
+      });
+      next.success_rate = next.total_orders > 0
+        ? Math.round((next.completed / next.total_orders) * 10000) / 100
+        : 0;
+      return next;
+    });
+  };
+
   const fetchStats = async () => {
     try {
-      const response = await axios.get(`${API}/automation/stats`);
-      setStats(response.data);
+      setStats(await getWithEtag(`${API}/automation/stats`));
     } catch (e) {
       console.error('Failed to fetch stats:', e);
     }
   };
 
-  const fetchOrders = async () => {
+  const fetchOrders = async (activeFilters = filters) => {
+    const query = new URLSearchParams({ ...orderQueryParams(activeFilters), limit: ORDER_PAGE_SIZE });
     try {
-      const response = await axios.get(`${API}/automation/orders?limit=20`);
-      setOrders(response.data);
+      const data = await getWithEtag(`${API}/automation/orders?${query}`);
+      setOrders(data.orders);
+      setNextCursor(data.next_cursor);
     } catch (e) {
       console.error('Failed to fetch orders:', e);
     }
   };
 
+  const loadMoreOrders = useCallback(async () => {
+    if (!nextCursor || loadingMoreRef.current) return;
+    loadingMoreRef.current = true;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${API}/automation/orders`, {
+        params: { ...orderQueryParams(filters), limit: ORDER_PAGE_SIZE, cursor: nextCursor },
+      });
+      // The filters changed while this page was loading
+      if (filtersRef.current !== filters) return;
+      setOrders((prev) => {
+        // Orders pushed live may already be in the list
+        const seen = new Set(prev.map((o) => o.order_id));
+        return [...prev, ...response.data.orders.filter((o) => !seen.has(o.order_id))];
+      });
+      setNextCursor(response.data.next_cursor);
+    } catch (e) {
+      console.error('Failed to load more orders:', e);
+    } finally {
+      loadingMoreRef.current = false;
+      setLoadingMore(false);
+    }
+  }, [nextCursor, filters]);
+
+  const applyFilters = (next) => {
+    filtersRef.current = next;
+    setFilters(next);
+    setNextCursor(null);
+    fetchOrders(next);
+  };
+
+  const handleFilterSubmit = (e) => {
+    e.preventDefault();
+    const playerUid = filterForm.playerUid.trim();
+    if (filterForm.uidPrefix && playerUid && playerUid.length < MIN_UID_PREFIX_LENGTH) {
+      alert(`Enter at least ${MIN_UID_PREFIX_LENGTH} characters for a UID prefix search`);
+      return;
+    }
+    applyFilters({ ...filterForm, playerUid });
+  };
+
+  const clearFilters = () => {
+    setFilterForm(EMPTY_FILTERS);
+    applyFilters(EMPTY_FILTERS);
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
     try {
       const response = await axios.post(`${API}/automation/topup`, formData);
       alert(`Order ${response.data.order_id} created successfully!`);
-      await fetchStats();
-      await fetchOrders();
     } catch (error) {
       alert(`Failed to create order: ${error.response?.data?.detail || error.message}`);
     } finally {
@@ -57,13 +214,23 @@ const Home = () => {
     try {
       await axios.post(`${API}/automation/orders/${orderId}/retry`);
       alert('Order queued for retry!');
-      await fetchStats();
-      await fetchOrders();
     } catch (error) {
       alert(`Failed to retry: ${error.response?.data?.detail || error.message}`);
     }
   };
 
+  const selectOrder = async (orderId) => {
+    if (selectedOrder?.order_id === orderId) {
+      setSelectedOrder(null);
+      return;
+    }
+    try {
+      setSelectedOrder(await getWithEtag(`${API}/automation/orders/${orderId}`));
+    } catch (e) {
+      console.error('Failed to fetch order details:', e);
+    }
+  };
+
   const getStatusColor = (status) => {
     switch (status) {
       case 'completed': return 'bg-green-100 text-green-800';
@@ -180,7 +347,7 @@ const Home = () => {
           <div className="lg:col-span-2">
             <div className="bg-white rounded-lg shadow-md p-6">
               <div className="flex justify-between items-center mb-6">
-                <h2 className="text-2xl font-bold text-gray-900">Recent Orders</h2>
+                <h2 className="text-2xl font-bold text-gray-900">Orders</h2>
                 <button
                   onClick={() => { fetchStats(); fetchOrders(); }}
                   data-testid="refresh-button"
@@ -190,63 +357,144 @@ const Home = () => {
                 </button>
               </div>
 
-              <div className="space-y-4" data-testid="orders-list">
-                {orders.length === 0 ? (
-                  <div className="text-center py-12 text-gray-500">
-                    <p>No orders yet. Create your first order!</p>
-                  </div>
-                ) : (
-                  orders.map((order) => (
-                    <div
-                      key={order.order_id}
-                      data-testid={`order-${order.order_id}`}
-                      className="border border-gray-200 rounded-lg p-4 hover:shadow-md transition"
+              <form
+                onSubmit={handleFilterSubmit}
+                data-testid="order-filters"
+                className="flex flex-wrap items-end gap-3 mb-6 pb-6 border-b border-gray-200"
+              >
+                <div>
+                  <label className="block text-xs font-medium text-gray-600 mb-1">Status</label>
+                  <select
+                    data-testid="filter-status"
+                    value={filterForm.status}
+                    onChange={(e) => setFilterForm({ ...filterForm, status: e.target.value })}
+                    className="px-3 py-2 border border-gray-300 rounded-lg text-sm"
+                  >
+                    <option value="">All</option>
+                    <option value="queued">Queued</option>
+                    <option value="processing">Processing</option>
+                    <option value="completed">Completed</option>
+                    <option value="failed">Failed</option>
+                    <option value="manual_pending">Manual pending</option>
+                  </select>
+                </div>
+                <div>
+                  <label className="block text-xs font-medium text-gray-600 mb-1">Player UID</label>
+                  <input
+                    type="text"
+                    data-testid="filter-player-uid"
+                    value={filterForm.playerUid}
+                    onChange={(e) => setFilterForm({ ...filterForm, playerUid: e.target.value })}
+                    placeholder="e.g. 301372144"
+                    className="w-36 px-3 py-2 border border-gray-300 rounded-lg text-sm"
+                  />
+                </div>
+                <label className="flex items-center gap-1 pb-2 text-xs text-gray-600">
+                  <input
+                    type="checkbox"
+                    data-testid="filter-uid-prefix"
+                    checked={filterForm.uidPrefix}
+                    onChange={(e) => setFilterForm({ ...filterForm, uidPrefix: e.target.checked })}
+                  />
+                  Prefix match
+                </label>
+                <div>
+                  <label className="block text-xs font-medium text-gray-600 mb-1">From</label>
+                  <input
+                    type="date"
+                    data-testid="filter-start"
+                    value={filterForm.start}
+                    onChange={(e) => setFilterForm({ ...filterForm, start: e.target.value })}
+                    className="px-3 py-2 border border-gray-300 rounded-lg text-sm"
+                  />
+                </div>
+                <div>
+                  <label className="block text-xs font-medium text-gray-600 mb-1">To</label>
+                  <input
+                    type="date"
+                    data-testid="filter-end"
+                    value={filterForm.end}
+                    onChange={(e) => setFilterForm({ ...filterForm, end: e.target.value })}
+                    className="px-3 py-2 border border-gray-300 rounded-lg text-sm"
+                  />
+                </div>
+                <button
+                  type="submit"
+                  data-testid="apply-filters-button"
+                  className="px-4 py-2 bg-blue-600 hover:bg-blue-700 text-white text-sm rounded-lg transition"
+                >
+                  Search
+                </button>
+                <button
+                  type="button"
+                  onClick={clearFilters}
+                  data-testid="clear-filters-button"
+                  className="px-4 py-2 bg-gray-100 hover:bg-gray-200 text-gray-700 text-sm rounded-lg transition"
+                >
+                  Clear
+                </button>
+              </form>
+
+              {selectedOrder && (
+                <div className="mb-6 border border-blue-200 bg-blue-50 rounded-lg p-4" data-testid={`order-details-${selectedOrder.order_id}`}>
+                  <div className="flex justify-between items-start mb-2">
+                    <div className="flex items-center gap-2">
+                      <span className="font-mono text-sm text-gray-700">{selectedOrder.order_id}</span>
+                      <span className={`px-2 py-1 rounded-full text-xs font-medium ${getStatusColor(selectedOrder.status)}`}>
+                        {selectedOrder.status}
+                      </span>
+                    </div>
+                    <button
+                      onClick={() => setSelectedOrder(null)}
+                      data-testid="close-order-details"
+                      className="text-xs text-gray-500 hover:text-gray-700"
                     >
-                      <div className="flex justify-between items-start mb-2">
-                        <div>
-                          <div className="flex items-center gap-2 mb-1">
-                            <span className="font-mono text-sm text-gray-600">
-                              {order.order_id.substring(0, 8)}...
-                            </span>
-                            <span className={`px-2 py-1 rounded-full text-xs font-medium ${getStatusColor(order.status)}`}>
-                              {order.status}
-                            </span>
-                          </div>
-                          <p className="text-sm text-gray-700">
-                            <strong>UID:</strong> {order.player_uid} | <strong>Diamonds:</strong> {order.diamond_amount}
-                          </p>
-                        </div>
-                        {(order.status === 'failed' || order.status === 'manual_pending') && (
-                          <button
-                            onClick={() => handleRetry(order.order_id)}
-                            data-testid={`retry-${order.order_id}`}
-                            className="px-3 py-1 bg-orange-500 hover:bg-orange-600 text-white text-sm rounded transition"
-                          >
-                            Retry
-                          </button>
-                        )}
-                      </div>
-                      <p className="text-sm text-gray-600 mb-2">{order.message}</p>
-                      {order.error && (
-                        <p className="text-xs text-red-600 mb-2">
-                          <strong>Error:</strong> {order.error}
-                        </p>
-                      )}
-                      <div className="text-xs text-gray-500">
-                        <p>Created: {new Date(order.created_at).toLocaleString()}</p>
-                        {order.completed_at && (
-                          <p>Completed: {new Date(order.completed_at).toLocaleString()}</p>
-                        )}
-                        {order.screenshots && order.screenshots.length > 0 && (
-                          <p className="text-blue-600 mt-1">
-                            {order.screenshots.length} screenshot(s) available
-                          </p>
-                        )}
-                      </div>
+                      Close
+                    </button>
+                  </div>
+                  <p className="text-sm text-gray-700 mb-1">
+                    <strong>UID:</strong> {selectedOrder.player_uid} | <strong>Diamonds:</strong> {selectedOrder.diamond_amount}
+                  </p>
+                  <p className="text-sm text-gray-600 mb-2">{selectedOrder.message}</p>
+                  {selectedOrder.error && (
+                    <p className="text-xs text-red-600 mb-2">
+                      <strong>Error:</strong> {selectedOrder.error}
+                    </p>
+                  )}
+                  <div className="text-xs text-gray-500">
+                    <p>Created: {new Date(selectedOrder.created_at).toLocaleString()}</p>
+                    {selectedOrder.completed_at && (
+                      <p>Completed: {new Date(selectedOrder.completed_at).toLocaleString()}</p>
+                    )}
+                  </div>
+                  {selectedOrder.screenshots?.length > 0 && (
+                    <div className="flex flex-wrap gap-2 mt-2" data-testid={`screenshots-${selectedOrder.order_id}`}>
+                      {selectedOrder.screenshots.filter(isScreenshotId).map((id) => (
+                        <a key={id} href={`${API}/screenshots/${id}`} target="_blank" rel="noreferrer">
+                          <img
+                            src={`${API}/screenshots/${id}?thumbnail=true`}
+                            alt="Automation screenshot"
+                            loading="lazy"
+                            className="h-16 rounded border border-gray-200"
+                          />
+                        </a>
+                      ))}
                     </div>
-                  ))
-                )}
-              </div>
+                  )}
+                </div>
+              )}
+
+              <OrderTable
+                orders={orders}
+                hasMore={Boolean(nextCursor)}
+                loadingMore={loadingMore}
+                onLoadMore={loadMoreOrders}
+                onRetry={handleRetry}
+                onSelect={selectOrder}
+                selectedId={selectedOrder?.order_id}
+                getStatusColor={getStatusColor}
+                emptyMessage={Object.keys(orderQueryParams(filters)).length ? 'No orders match these filters.' : undefined}
+              />
             </div>
           </div>
         </div>
@@ -0,0 +1,111 @@
+import { useEffect, useState } from 'react';
+
+// Rows have a fixed height so the visible slice can be computed from the scroll offset
+const ROW_HEIGHT = 64;
+const VIEWPORT_HEIGHT = 640;
+// Rows rendered beyond each edge of the viewport to avoid blank flashes while scrolling
+const OVERSCAN = 6;
+
+const OrderTable = ({
+  orders,
+  hasMore,
+  loadingMore,
+  onLoadMore,
+  onRetry,
+  onSelect,
+  selectedId,
+  getStatusColor,
+  emptyMessage = 'No orders yet. Create your first order!',
+}) => {
+  const [scrollTop, setScrollTop] = useState(0);
+
+  const first = Math.max(0, Math.floor(scrollTop / ROW_HEIGHT) - OVERSCAN);
+  const last = Math.min(orders.length, Math.ceil((scrollTop + VIEWPORT_HEIGHT) / ROW_HEIGHT) + OVERSCAN);
+
+  // Request the next page before the user reaches the end of what is loaded
+  useEffect(() => {
+    if (hasMore && !loadingMore && last >= orders.length - OVERSCAN) {
+      onLoadMore();
+    }
+  }, [last, orders.length, hasMore, loadingMore, onLoadMore]);
+
+  if (orders.length === 0 && !hasMore && !loadingMore) {
+    return (
+      <div className="text-center py-12 text-gray-500" data-testid="orders-list">
+        <p>{emptyMessage}</p>
+      </div>
+    );
+  }
+
+  return (
+    <div data-testid="orders-list">
+      <div className="grid grid-cols-12 gap-2 px-3 pb-2 text-xs font-medium text-gray-500 uppercase border-b border-gray-200">
+        <div className="col-span-3">Order</div>
+        <div className="col-span-2">Status</div>
+        <div className="col-span-2">UID</div>
+        <div className="col-span-1 text-right">Diamonds</div>
+        <div className="col-span-2">Created</div>
+        <div className="col-span-2 text-right">Actions</div>
+      </div>
+
+      <div
+        className="overflow-y-auto"
+        style={{ height: VIEWPORT_HEIGHT }}
+        onScroll={(e) => setScrollTop(e.currentTarget.scrollTop)}
+        data-testid="orders-viewport"
+      >
+        <div style={{ height: orders.length * ROW_HEIGHT, position: 'relative' }}>
+          {orders.slice(first, last).map((order, i) => (
+            <div
+              key={order.order_id}
+              data-testid={`order-${order.order_id}`}
+              className={`grid grid-cols-12 gap-2 items-center px-3 border-b border-gray-100 text-sm ${
+                order.order_id === selectedId ? 'bg-blue-50' : 'hover:bg-gray-50'
+              }`}
+              style={{ position: 'absolute', top: (first + i) * ROW_HEIGHT, left: 0, right: 0, height: ROW_HEIGHT }}
+            >
+              <div className="col-span-3 min-w-0">
+                <div className="font-mono text-gray-600">{order.order_id.substring(0, 8)}...</div>
+                {order.error && (
+                  <div className="text-xs text-red-600 truncate" title={order.error}>{order.error}</div>
+                )}
+              </div>
+              <div className="col-span-2">
+                <span className={`px-2 py-1 rounded-full text-xs font-medium ${getStatusColor(order.status)}`}>
+                  {order.status}
+                </span>
+              </div>
+              <div className="col-span-2 text-gray-700 truncate">{order.player_uid}</div>
+              <div className="col-span-1 text-right text-gray-700">{order.diamond_amount}</div>
+              <div className="col-span-2 text-xs text-gray-500">{new Date(order.created_at).toLocaleString()}</div>
+              <div className="col-span-2 flex justify-end gap-2">
+                <button
+                  onClick={() => onSelect(order.order_id)}
+                  data-testid={`details-${order.order_id}`}
+                  className="text-xs text-blue-600 hover:underline"
+                >
+                  Details
+                </button>
+                {(order.status === 'failed' || order.status === 'manual_pending') && (
+                  <button
+                    onClick={() => onRetry(order.order_id)}
+                    data-testid={`retry-${order.order_id}`}
+                    className="px-2 py-1 bg-orange-500 hover:bg-orange-600 text-white text-xs rounded transition"
+                  >
+                    Retry
+                  </button>
+                )}
+              </div>
+            </div>
+          ))}
+        </div>
+      </div>
+
+      <div className="pt-2 text-xs text-gray-500 text-center">
+        {loadingMore ? 'Loading more orders...' : `${orders.length} orders loaded${hasMore ? '' : ' (end of history)'}`}
+      </div>
+    </div>
+  );
+};
+
+export default OrderTable;
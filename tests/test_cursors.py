@@ -0,0 +1,107 @@
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
+os.environ.setdefault("SCREENSHOT_STORE_DIR", tempfile.mkdtemp())
+
+from server import decode_cursor, encode_cursor, merge_order_pages  # noqa: E402
+
+BASE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def mixed_orders():
+    """Datetime and legacy ISO-string created_at values, with ties in both types"""
+    orders = []
+    for i in range(10):
+        created_at = BASE + timedelta(hours=i // 2)
+        orders.append({"order_id": f"d{i:02d}", "created_at": created_at})
+    for i in range(9):
+        created_at = (BASE - timedelta(days=30) + timedelta(hours=i // 3)).isoformat()
+        orders.append({"order_id": f"s{i:02d}", "created_at": created_at})
+    return orders
+
+
+def expected_order(orders, direction):
+    # MongoDB sorts strings before dates
+    def key(order):
+        return (isinstance(order["created_at"], datetime), order["created_at"], order["order_id"])
+    return [o["order_id"] for o in sorted(orders, key=key, reverse=direction == -1)]
+
+
+async def page_through(collection, sort, limit):
+    seen = []
+    cursor = None
+    while True:
+        query = decode_cursor(cursor, sort) if cursor else {}
+        page = await collection.find(query, {"_id": 0}).sort(sort).limit(limit).to_list(limit)
+        seen += [order["order_id"] for order in page]
+        if len(page) < limit:
+            return seen
+        cursor = encode_cursor(page[-1], sort)
+
+
+@pytest.mark.parametrize("direction", [-1, 1])
+@pytest.mark.parametrize("limit", [1, 3, 4, 50])
+def test_pages_mixed_timestamps_exactly_once(direction, limit):
+    async def scenario():
+        collection = AsyncMongoMockClient()["test"]["topup_orders"]
+        await collection.insert_many(mixed_orders())
+        return await page_through(collection, [("created_at", direction), ("order_id", direction)], limit)
+
+    assert run(scenario()) == expected_order(mixed_orders(), direction)
+
+
+def test_legacy_cursor_keeps_string_value():
+    sort = [("created_at", -1), ("order_id", -1)]
+    legacy = {"order_id": "s01", "created_at": "2024-12-02T00:00:00+00:00"}
+
+    query = decode_cursor(encode_cursor(legacy, sort), sort)
+
+    assert query["$or"][0] == {"created_at": {"$lt": "2024-12-02T00:00:00+00:00"}}
+    # Descending from a string cursor only strings remain, so no $type clause
+    assert len(query["$or"]) == 2
+
+
+def test_date_cursor_reaches_legacy_strings_when_descending():
+    sort = [("created_at", -1), ("order_id", -1)]
+    query = decode_cursor(encode_cursor({"order_id": "d01", "created_at": BASE}, sort), sort)
+
+    assert {"created_at": {"$type": "string"}} in query["$or"]
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor", [("created_at", -1), ("order_id", -1)])
+    assert error.value.status_code == 400
+
+
+def test_merge_sorts_dates_before_legacy_strings_and_keeps_hot_copy():
+    hot = [
+        {"order_id": "d01", "created_at": BASE, "status": "queued"},
+        {"order_id": "s01", "created_at": "2024-12-01T00:00:00+00:00"},
+    ]
+    archived = [
+        {"order_id": "d01", "created_at": BASE, "status": "failed"},
+        {"order_id": "d00", "created_at": BASE},
+        {"order_id": "d02", "created_at": BASE + timedelta(hours=1)},
+        {"order_id": "s02", "created_at": "2024-12-02T00:00:00+00:00"},
+    ]
+
+    merged = merge_order_pages(hot + archived)
+
+    assert [o["order_id"] for o in merged] == ["d02", "d01", "d00", "s02", "s01"]
+    assert merged[1]["status"] == "queued"
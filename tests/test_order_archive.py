@@ -0,0 +1,209 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from order_archive import (  # noqa: E402
+    ARCHIVE_COLLECTION,
+    archive_orders,
+    archived_counts,
+    find_archived_order,
+    restore_order,
+)
+
+OLD = datetime.now(timezone.utc) - timedelta(days=60)
+
+
+def order(order_id, status, created_at=OLD):
+    return {
+        "order_id": order_id,
+        "status": status,
+        "player_uid": "301372144",
+        "diamond_amount": 25,
+        "created_at": created_at,
+    }
+
+
+class AfterArchiveWrite:
+    """Database wrapper that runs ``callback(db)`` right after each batch is copied to
+    the archive, before it is deleted from topup_orders, as a request landing
+    mid-batch would"""
+
+    def __init__(self, db, callback):
+        self._db = db
+        self._callback = callback
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        collection = self._db[name]
+        if name != ARCHIVE_COLLECTION:
+            return collection
+
+        db, callback = self._db, self._callback
+
+        class Archive:
+            def __getattr__(self, attr):
+                return getattr(collection, attr)
+
+            async def bulk_write(self, *args, **kwargs):
+                result = await collection.bulk_write(*args, **kwargs)
+                await callback(db)
+                return result
+
+        return Archive()
+
+
+async def requeue(db, order_ids):
+    await db.topup_orders.update_many({"order_id": {"$in": order_ids}}, {"$set": {"status": "queued"}})
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def new_db():
+    return AsyncMongoMockClient()["test"]
+
+
+def test_archives_only_old_terminal_orders():
+    async def scenario():
+        db = new_db()
+        await db.topup_orders.insert_many([
+            order("old-completed", "completed"),
+            order("old-failed", "failed"),
+            order("old-pending", "manual_pending"),
+            order("new-completed", "completed", created_at=datetime.now(timezone.utc)),
+        ])
+
+        moved = await archive_orders(db, timedelta(days=30), batch_size=1)
+
+        hot = sorted(await db.topup_orders.distinct("order_id"))
+        archived = sorted(await db[ARCHIVE_COLLECTION].distinct("order_id"))
+        return moved, hot, archived, await archived_counts(db)
+
+    moved, hot, archived, counts = run(scenario())
+    assert moved == 2
+    assert hot == ["new-completed", "old-pending"]
+    assert archived == ["old-completed", "old-failed"]
+    assert counts == {"completed": 1, "failed": 1}
+
+
+def test_order_retried_mid_archival_stays_hot():
+    async def scenario():
+        db = new_db()
+        await db.topup_orders.insert_many([order("retried", "failed"), order("done", "completed")])
+
+        moved = await archive_orders(AfterArchiveWrite(db, lambda db: requeue(db, ["retried"])), timedelta(days=30))
+
+        hot = await db.topup_orders.find_one({"order_id": "retried"})
+        archived = await db[ARCHIVE_COLLECTION].distinct("order_id")
+        return moved, hot, archived, await archived_counts(db)
+
+    moved, hot, archived, counts = run(scenario())
+    assert moved == 1
+    assert hot["status"] == "queued"
+    assert archived == ["done"]
+    # Only the order that actually left the hot collection is counted
+    assert counts == {"completed": 1}
+
+
+def test_restore_mid_archival_leaves_hot_copy_in_place():
+    async def scenario():
+        db = new_db()
+        await db.topup_orders.create_index("order_id", unique=True)
+        await db.topup_orders.insert_one(order("a", "failed"))
+
+        restored = []
+
+        async def retry(db):
+            # What retry_order does: restore, then re-queue the hot copy
+            restored.append(await restore_order(db, "a"))
+            await requeue(db, ["a"])
+
+        moved = await archive_orders(AfterArchiveWrite(db, retry), timedelta(days=30))
+        return (
+            moved,
+            restored,
+            await db.topup_orders.find_one({"order_id": "a"}, {"_id": 0, "status": 1}),
+            await db[ARCHIVE_COLLECTION].count_documents({}),
+            await archived_counts(db),
+        )
+
+    moved, restored, hot, archived, counts = run(scenario())
+    assert moved == 0
+    assert restored == [None]
+    assert hot == {"status": "queued"}
+    assert archived == 0
+    assert counts == {}
+
+
+def test_concurrent_archivers_count_each_order_once():
+    async def scenario():
+        db = new_db()
+        await db.topup_orders.insert_many([order(f"o{i}", "completed") for i in range(5)])
+
+        # A second archiver runs to completion between the first one's copy and delete
+        async def other_archiver(db):
+            await archive_orders(db, timedelta(days=30))
+
+        first = await archive_orders(AfterArchiveWrite(db, other_archiver), timedelta(days=30))
+        return (
+            first,
+            await db.topup_orders.count_documents({}),
+            await db[ARCHIVE_COLLECTION].count_documents({}),
+            await archived_counts(db),
+        )
+
+    first, hot, archived, counts = run(scenario())
+    assert first == 0
+    assert hot == 0
+    assert archived == 5
+    assert counts == {"completed": 5}
+
+
+def test_rerun_after_interrupted_batch_does_not_duplicate():
+    async def scenario():
+        db = new_db()
+        await db.topup_orders.insert_one(order("a", "completed"))
+        # A previous run copied the order but died before deleting it
+        await db[ARCHIVE_COLLECTION].insert_one({**order("a", "completed"), "archived_at": OLD})
+
+        moved = await archive_orders(db, timedelta(days=30))
+        return moved, await db[ARCHIVE_COLLECTION].count_documents({}), await db.topup_orders.count_documents({})
+
+    assert run(scenario()) == (1, 1, 0)
+
+
+def test_restore_moves_order_back_and_decrements_counter():
+    async def scenario():
+        db = new_db()
+        await db.topup_orders.insert_many([order("a", "failed"), order("b", "failed")])
+        await archive_orders(db, timedelta(days=30))
+
+        restored = await restore_order(db, "a")
+        return (
+            restored,
+            await db.topup_orders.find_one({"order_id": "a"}, {"_id": 0}),
+            await find_archived_order(db, "a"),
+            await archived_counts(db),
+        )
+
+    restored, hot, archived, counts = run(scenario())
+    assert restored["status"] == "failed"
+    assert "archived_at" not in hot
+    assert archived is None
+    assert counts == {"failed": 1}
+
+
+def test_restore_missing_order_returns_none():
+    async def scenario():
+        db = new_db()
+        return await restore_order(db, "missing"), await archived_counts(db)
+
+    assert run(scenario()) == (None, {})